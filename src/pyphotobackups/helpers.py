@@ -5,17 +5,26 @@ import os
 import re
 import shutil
 import sqlite3
+import stat
+import struct
 import subprocess
-import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
+from typing import BinaryIO, Iterator
 
-import piexif
-from PIL import Image
-from pillow_heif import register_heif_opener
 from tqdm import tqdm
 
-register_heif_opener()
+SYNC_BATCH_SIZE = 200
+UNWANTED_EXTENSIONS = (".aae",)
+
+# EXIF tags
+EXIF_DATETIME = 0x0132
+EXIF_DATETIME_ORIGINAL = 0x9003
+EXIF_IFD_POINTER = 0x8769
+EXIF_DATETIME_PATTERN = re.compile(rb"\d{4}:\d{2}:\d{2} \d{2}:\d{2}:\d{2}")
+# Size in bytes of each TIFF field type, by type id
+TIFF_TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 6: 1, 7: 1, 8: 2, 9: 4, 10: 8, 11: 4, 12: 8}
 
 
 class Abort(Exception):
@@ -62,6 +71,9 @@ def init_db(target_dir: Path) -> sqlite3.Connection:
     """
     conn = sqlite3.connect(get_db_path(target_dir))
     cursor = conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
     cursor.execute(
         """
         CREATE TABLE IF NOT EXISTS sync (
@@ -98,17 +110,44 @@ def is_processed_source(source: str, conn: sqlite3.Connection) -> bool:
     Check if a file from source has already been processed by its path (as in format `100APPLE/IMAGE_001.png` etc.)
     """
     cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) FROM sync WHERE source = ?", (source,))
-    count = cursor.fetchone()[0]
+    cursor.execute("SELECT 1 FROM sync WHERE source = ? LIMIT 1", (source,))
+    row = cursor.fetchone()
     cursor.close()
-    return count > 0
+    return row is not None
 
 
-def is_unwanted_file(source: str):
-    ext = source.split(".")[1].lower()
-    if ext == "aae":
-        return True
-    False
+def get_processed_sources(conn: sqlite3.Connection) -> set[str]:
+    """
+    Load the sources of all processed files into memory, so that lookups during a run do not need
+    to query the database for every file.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT source FROM sync")
+    sources = {row[0] for row in cursor.fetchall()}
+    cursor.close()
+    return sources
+
+
+def insert_sync_records(records: list[tuple], conn: sqlite3.Connection) -> None:
+    """
+    Insert a batch of `(source, dest, timestamp)` rows into the `sync` table within a single
+    transaction. All rows of a batch share the same `inserted_at` time.
+    """
+    if not records:
+        return
+    inserted_at = datetime.now()
+    with conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO sync (source, dest, timestamp, inserted_at) VALUES (?, ?, ?, ?)",
+            [(*record, inserted_at) for record in records],
+        )
+
+
+def is_unwanted_file(source: str) -> bool:
+    """
+    Check if a file should not be backed up, such as `.AAE` photo edit sidecars.
+    """
+    return source.lower().endswith(UNWANTED_EXTENSIONS)
 
 
 # iPhone connection
@@ -118,16 +157,24 @@ def is_ifuse_installed() -> bool:
     return False
 
 
-def is_iPhone_mounted() -> bool:
-    with open("/proc/mounts", "r") as mounts:
+def is_iPhone_mounted(mount_point: Path) -> bool:
+    """
+    Check if an iPhone is mounted by ifuse at the given mount point.
+
+    The mount table is looked up instead of using `os.path.ismount`, because a disconnected iPhone
+    leaves a stale mount that cannot be stat'ed.
+    """
+    target = str(mount_point)
+    with open("/proc/self/mounts", "r") as mounts:
         for line in mounts:
-            if "ifuse" in line:
+            fields = line.split()
+            if len(fields) > 2 and fields[1] == target and "ifuse" in fields[2]:
                 return True
     return False
 
 
 def mount_iPhone(mount_point: Path) -> None:
-    if is_iPhone_mounted():
+    if is_iPhone_mounted(mount_point):
         raise Abort("iPhone is already mounted")
     mount_point.mkdir(parents=True, exist_ok=True)
     run = subprocess.run(
@@ -156,12 +203,54 @@ def get_serial_number() -> str:
 # Directory and File Operations
 def get_directory_size(path: Path) -> int:
     total_size = 0
-    for file in path.rglob("*"):
-        if file.is_file():
-            total_size += file.stat().st_size
+    stack = [path]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    total_size += entry.stat(follow_symlinks=False).st_size
     return total_size
 
 
+def parse_exif_datetime(value: bytes) -> datetime:
+    """
+    Parse an EXIF datetime such as `b"2024:01:31 12:00:00"`.
+
+    The format is fixed-width, so the fields are sliced and converted directly, which is much
+    cheaper than `datetime.strptime`.
+    """
+    fields = (value[0:4], value[5:7], value[8:10], value[11:13], value[14:16], value[17:19])
+    # separators sit at offsets 4, 7, 10, 13 and 16, and every field must be ASCII digits only
+    if len(value) < 19 or value[4:17:3] != b":: ::" or not all(field.isdigit() for field in fields):
+        raise ValueError(f"Invalid EXIF datetime: {value!r}")
+    return datetime(*(int(field) for field in fields))
+
+
+def read_png_exif_datetime(f: BinaryIO) -> datetime | None:
+    """
+    Find the EXIF datetime in the eXIf chunk of a PNG file, reading chunk headers from the file
+    positioned right after the signature, and seeking over the other chunks.
+    """
+    # Iterate over PNG chunks
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            return None  # EOF
+        length, chunk_type = struct.unpack(">I4s", header)
+        if chunk_type != b"eXIf":
+            f.seek(length + 4, os.SEEK_CUR)  # skip chunk data and CRC
+            continue
+        data = f.read(length)
+        f.read(4)  # skip CRC
+
+        # Look for EXIF-style datetime pattern
+        match = EXIF_DATETIME_PATTERN.search(data)
+        if match:
+            return parse_exif_datetime(match.group())
+
+
 def get_timestamp_by_png_metadata(path: Path) -> datetime | None:
     with open(path, "rb") as f:
         # Verify PNG signature
@@ -169,64 +258,249 @@ def get_timestamp_by_png_metadata(path: Path) -> datetime | None:
         if signature != b"\x89PNG\r\n\x1a\n":
             raise ValueError("Not a valid PNG file.")
 
-        # Iterate over PNG chunks
+        return read_png_exif_datetime(f)
+
+
+def get_tiff_tag(tiff: bytes, tag: int, sub_ifd_tag: int | None = None) -> bytes | None:
+    """
+    Look up the raw value of a tag in TIFF-formatted EXIF data, without parsing unrelated entries.
+
+    The tag is searched in the 0th IFD, or in the sub-IFD pointed to by `sub_ifd_tag` if given
+    (e.g. the Exif IFD for `DateTimeOriginal`). Returns None if the tag is missing or the data is
+    malformed.
+    """
+    byte_order = {b"II": "<", b"MM": ">"}.get(tiff[:2])
+    if byte_order is None:
+        return None
+    try:
+        (ifd_offset,) = struct.unpack_from(byte_order + "I", tiff, 4)
+        for lookup_tag in (sub_ifd_tag, tag):
+            if lookup_tag is None:
+                continue
+            (entry_count,) = struct.unpack_from(byte_order + "H", tiff, ifd_offset)
+            entries_start = ifd_offset + 2
+            for entry in range(entries_start, entries_start + entry_count * 12, 12):
+                entry_tag, entry_type, count = struct.unpack_from(byte_order + "HHI", tiff, entry)
+                if entry_tag != lookup_tag:
+                    continue
+                size = TIFF_TYPE_SIZES.get(entry_type, 1) * count
+                if size > 4:
+                    (value_offset,) = struct.unpack_from(byte_order + "I", tiff, entry + 8)
+                else:
+                    value_offset = entry + 8
+                value = tiff[value_offset : value_offset + size]
+                break
+            else:
+                return None
+            if lookup_tag == sub_ifd_tag:
+                (ifd_offset,) = struct.unpack_from(byte_order + "I", value)
+    except struct.error:
+        return None
+    return value
+
+
+def read_jpeg_exif(path: Path) -> bytes | None:
+    """
+    Read the TIFF-formatted EXIF data from the APP1 segment of a JPEG file, seeking over the other
+    segments.
+    """
+    with open(path, "rb") as f:
+        if f.read(2) != b"\xff\xd8":
+            raise ValueError("Not a valid JPEG file.")
         while True:
-            length_bytes = f.read(4)
-            if len(length_bytes) < 4:
-                break  # EOF
+            marker = f.read(2)
+            # stop at end of image or start of scan, as metadata segments come before image data
+            if len(marker) < 2 or marker[0] != 0xFF or marker[1] in (0xD9, 0xDA):
+                return None
+            length_bytes = f.read(2)
+            if len(length_bytes) < 2:
+                return None  # truncated file
             length = int.from_bytes(length_bytes, byteorder="big")
-            chunk_type = f.read(4).decode("ascii")
-            data = f.read(length)
-            f.read(4)  # skip CRC
-
-            if chunk_type == "eXIf":
-                # Look for EXIF-style datetime pattern
-                match = re.search(rb"\d{4}:\d{2}:\d{2} \d{2}:\d{2}:\d{2}", data)
-                if match:
-                    datetime_str = match.group().decode()
-                    return datetime.strptime(datetime_str, "%Y:%m:%d %H:%M:%S")
-    return None
+            if length < 2:
+                return None  # invalid segment length, which includes the length field itself
+            if marker[1] == 0xE1:
+                data = f.read(length - 2)
+                if data.startswith(b"Exif\x00\x00"):
+                    return data[6:]
+            else:
+                f.seek(length - 2, os.SEEK_CUR)
 
 
 def get_timestamp_by_jpeg_metadata(path: Path) -> datetime | None:
-    exif_dict = piexif.load(str(path))
-    date_time_original = exif_dict["Exif"].get(piexif.ExifIFD.DateTimeOriginal)
+    exif = read_jpeg_exif(path)
+    if exif is None:
+        return None
+    date_time_original = get_tiff_tag(exif, EXIF_DATETIME_ORIGINAL, sub_ifd_tag=EXIF_IFD_POINTER)
     if date_time_original:
-        return datetime.strptime(date_time_original.decode("utf-8"), "%Y:%m:%d %H:%M:%S")
+        return parse_exif_datetime(date_time_original)
     return None
 
 
-def get_timestamp_by_heic_metadata(path: Path) -> datetime | None:
-    image = Image.open(path)
-    exif_data = image.getexif()
+def iter_isobmff_boxes(
+    data: bytes, offset: int = 0, end: int | None = None
+) -> Iterator[tuple[bytes, int, int]]:
+    """
+    Iterate over the ISOBMFF boxes in `data[offset:end]`.
+
+    Yields:
+        tuple[bytes, int, int]: The box type, and the start and end offsets of its payload.
+    """
+    if end is None:
+        end = len(data)
+    while offset + 8 <= end:
+        size, box_type = struct.unpack_from(">I4s", data, offset)
+        header_size = 8
+        if size == 1:
+            size = struct.unpack_from(">Q", data, offset + 8)[0]
+            header_size = 16
+        elif size == 0:
+            size = end - offset
+        if size < header_size:
+            return
+        yield box_type, offset + header_size, min(offset + size, end)
+        offset += size
+
+
+def read_heic_meta_box(f: BinaryIO) -> bytes | None:
+    """
+    Read the payload of the top-level `meta` box of a HEIC file, seeking over every other box.
+    """
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            return None
+        size, box_type = struct.unpack(">I4s", header)
+        header_size = 8
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+            header_size = 16
+        if size != 0 and size < header_size:
+            return None
+        if box_type == b"meta":
+            # a size of 0 means the box extends to the end of the file
+            return f.read(size - header_size) if size else f.read()
+        if size == 0:
+            return None
+        f.seek(size - header_size, os.SEEK_CUR)
+
+
+def get_heic_exif_extents(meta: bytes) -> list[tuple[int, int]] | None:
+    """
+    Find the `(offset, length)` file extents of the Exif item, given the payload of a `meta` box.
+    """
+    exif_item_id = None
+    iloc = None
+    # `meta` is a full box, children start after version and flags
+    for box_type, start, end in iter_isobmff_boxes(meta, 4):
+        if box_type == b"iinf":
+            entries_start = start + (6 if meta[start] == 0 else 8)
+            for infe_type, infe_start, _ in iter_isobmff_boxes(meta, entries_start, end):
+                version = meta[infe_start]
+                if infe_type != b"infe" or version < 2:
+                    continue
+                if version == 2:
+                    item_id, item_type = struct.unpack_from(">H2x4s", meta, infe_start + 4)
+                else:
+                    item_id, item_type = struct.unpack_from(">I2x4s", meta, infe_start + 4)
+                if item_type == b"Exif":
+                    exif_item_id = item_id
+                    break
+        elif box_type == b"iloc":
+            iloc = (start, end)
+    if exif_item_id is None or iloc is None:
+        return None
+
+    def read_uint(offset: int, size: int) -> int:
+        return int.from_bytes(meta[offset : offset + size], byteorder="big")
+
+    offset = iloc[0]
+    version = meta[offset]
+    offset_size, length_size = meta[offset + 4] >> 4, meta[offset + 4] & 0x0F
+    base_offset_size, index_size = meta[offset + 5] >> 4, meta[offset + 5] & 0x0F
+    if version not in (1, 2):
+        index_size = 0
+    id_size = 2 if version < 2 else 4
+    item_count = read_uint(offset + 6, id_size)
+    offset += 6 + id_size
+    for _ in range(item_count):
+        item_id = read_uint(offset, id_size)
+        offset += id_size
+        construction_method = 0
+        if version in (1, 2):
+            construction_method = read_uint(offset, 2) & 0x0F
+            offset += 2
+        offset += 2  # skip data_reference_index
+        base_offset = read_uint(offset, base_offset_size)
+        offset += base_offset_size
+        extent_count = read_uint(offset, 2)
+        offset += 2
+        extents = []
+        for _ in range(extent_count):
+            offset += index_size
+            extent_offset = read_uint(offset, offset_size)
+            offset += offset_size
+            extent_length = read_uint(offset, length_size)
+            offset += length_size
+            extents.append((base_offset + extent_offset, extent_length))
+        if item_id == exif_item_id:
+            # only items stored at file offsets are supported
+            return extents if construction_method == 0 else None
+    return None
+
 
-    for tag_id, value in exif_data.items():
-        tag = Image.ExifTags.TAGS.get(tag_id, tag_id)
-        if tag == "DateTime":
-            return datetime.strptime(value, "%Y:%m:%d %H:%M:%S")
+def get_timestamp_by_heic_metadata(path: Path) -> datetime | None:
+    """
+    Read the EXIF `DateTime` of a HEIC file by walking its box structure, without decoding the
+    image. Returns None if the box structure is malformed.
+    """
+    with open(path, "rb") as f:
+        try:
+            meta = read_heic_meta_box(f)
+            if meta is None:
+                return None
+            extents = get_heic_exif_extents(meta)
+        except (struct.error, IndexError):
+            return None
+        if not extents:
+            return None
+        exif = b""
+        for offset, length in extents:
+            f.seek(offset)
+            exif += f.read(length)
+
+    # The Exif item starts with the offset to the TIFF header
+    tiff_header_offset = int.from_bytes(exif[:4], byteorder="big")
+    date_time = get_tiff_tag(exif[4 + tiff_header_offset :], EXIF_DATETIME)
+    if date_time:
+        return parse_exif_datetime(date_time)
     return None
 
 
-def get_timestamp_by_file_system(path: Path) -> datetime:
-    timestamp = path.stat().st_mtime
-    last_modified = datetime.fromtimestamp(timestamp)
-    return last_modified
+def get_timestamp_by_file_system(path: Path, file_stat: os.stat_result | None = None) -> datetime:
+    if file_stat is None:
+        file_stat = path.stat()
+    return datetime.fromtimestamp(file_stat.st_mtime)
+
+
+# Metadata parsers by file extension. Files with other extensions fall back to filesystem times.
+TIMESTAMP_PARSERS = {
+    ".jpg": get_timestamp_by_jpeg_metadata,
+    ".jpeg": get_timestamp_by_jpeg_metadata,
+    ".png": get_timestamp_by_png_metadata,
+    ".heic": get_timestamp_by_heic_metadata,
+}
 
 
-def get_timestamp(path: Path) -> datetime:
+def get_timestamp(path: Path, file_stat: os.stat_result | None = None) -> datetime:
     """
     Get the most accurate timestamp for a file, preferring metadata over filesystem times.
+
+    `file_stat` can be given to reuse a stat result for the filesystem fallback.
     """
-    ext = path.suffix.lower()[1:]
-    func_mapping = {
-        "jpg": get_timestamp_by_jpeg_metadata,
-        "jpeg": get_timestamp_by_jpeg_metadata,
-        "png": get_timestamp_by_png_metadata,
-        "heic": get_timestamp_by_heic_metadata,
-    }
-    timestamp = func_mapping.get(ext, get_timestamp_by_file_system)(path)
+    parser = TIMESTAMP_PARSERS.get(path.suffix.lower())
+    timestamp = parser(path) if parser else None
     if timestamp is None:
-        timestamp = get_timestamp_by_file_system(path)
+        timestamp = get_timestamp_by_file_system(path, file_stat)
     return timestamp
 
 
@@ -250,12 +524,78 @@ def convert_size_to_readable(size: int) -> str:
     return f"{num:.1f}T"
 
 
+def copy_file(source: Path, dest: Path, source_stat: os.stat_result | None = None) -> None:
+    """
+    Copy a file along with its permission bits and access and modification times, replacing
+    `dest` atomically.
+
+    The content is copied with `shutil.copyfile`, which uses in-kernel `os.sendfile` on Linux and
+    falls back to a userspace copy where it is unsupported, into a hidden temporary file next to
+    `dest`. The temporary file is then renamed into place. `source_stat` can be given to reuse a
+    stat result the caller already has, instead of querying the source again.
+    """
+    temp_path = dest.with_name(f".{dest.name}.tmp")
+    try:
+        if source_stat is None:
+            source_stat = os.stat(source)
+        shutil.copyfile(source, temp_path)
+        os.chmod(temp_path, stat.S_IMODE(source_stat.st_mode))
+        os.utime(temp_path, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns))
+        os.replace(temp_path, dest)
+    except OSError:
+        temp_path.unlink(missing_ok=True)
+        raise
+
+
+def sync_file(
+    entry: os.DirEntry, target_dir: Path, created_dirs: set[str]
+) -> tuple[str, datetime, int]:
+    """
+    Copy a file into the `YYYY-MM` subdirectory of the target directory matching its timestamp.
+
+    The file is stat'ed once through its directory entry, and the result is reused for the
+    filesystem timestamp fallback, for copying metadata and for the size. `created_dirs` holds the
+    `YYYY-MM` subdirectories known to exist, so each is only created once per run. This function
+    is safe to run from worker threads, as it does not touch the database.
+
+    Returns:
+        tuple[str, datetime, int]:
+            - dest (str): The path of the copied file, relative to the target directory.
+            - timestamp (datetime): The timestamp of the file.
+            - size (int): The size of the file in bytes.
+    """
+    file_path = Path(entry.path)
+    file_stat = entry.stat()
+    file_timestamp = get_timestamp(file_path, file_stat)
+    year_month = f"{file_timestamp.year:04d}-{file_timestamp.month:02d}"
+    target_subdir = target_dir / year_month
+    if year_month not in created_dirs:
+        target_subdir.mkdir(parents=True, exist_ok=True)
+        created_dirs.add(year_month)
+    target_file_path = target_subdir / entry.name
+
+    try:
+        copy_file(file_path, target_file_path, file_stat)
+    except OSError as e:
+        if e.errno == errno.EACCES:
+            print("[pyphotobackups] permission denied")
+            raise Abort
+        if e.errno == errno.ENOSPC:
+            print("[pyphotobackups] no enough space in destination directory")
+            raise Abort
+        raise e
+
+    return f"{year_month}/{entry.name}", file_timestamp, file_stat.st_size
+
+
 def process_dir_recursively(
     source_dir: Path,
     target_dir: Path,
     conn: sqlite3.Connection,
     processed: int,
     size_increment: int,
+    processed_sources: set[str] | None = None,
+    created_dirs: set[str] | None = None,
 ) -> tuple[int, int, int]:
     """
     Recursively processes files from the source directory, copying them to the target directory
@@ -267,6 +607,10 @@ def process_dir_recursively(
         - conn (sqlite3.Connection): The database connection for file sync tracking.
         - processed (int): The number of files processed, updated during recursion.
         - size_increment (int): The total size of processed files, updated during recursion.
+        - processed_sources (set[str] | None): Sources already in the database. Loaded from `conn`
+          on the first call if not provided, and shared across recursion.
+        - created_dirs (set[str] | None): `YYYY-MM` subdirectories created during this run, shared
+          across recursion.
 
     Returns:
         tuple[int, int, int]:
@@ -275,72 +619,90 @@ def process_dir_recursively(
             - size_increment (int): Updated total file size in bytes.
 
     Notes:
-        - Copies files to a subdirectory based on their timestamp.
+        - Copies files to a subdirectory based on their timestamp, using a thread pool.
         - If file with the same name exists, an increment suffix will be appended.
         - Skips already processed files and handles errors like permission issues or insufficient space.
+        - Sync records are written in batches of `SYNC_BATCH_SIZE`, and flushed before returning
+          so that progress is kept even if the run is interrupted.
     """
+    if processed_sources is None:
+        processed_sources = get_processed_sources(conn)
+    if created_dirs is None:
+        created_dirs = set()
+    records = []
     try:
-        dirs = [path for path in source_dir.iterdir() if path.is_dir()]
-        dirs = sorted(dirs)
-        files = [path for path in source_dir.iterdir() if path.is_file()]
+        dirs = []
+        files = []
+        with os.scandir(source_dir) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    dirs.append(Path(entry.path))
+                elif entry.is_file():
+                    files.append(entry)
+        dirs.sort()
         exit_code = 0
 
         # depth first
         for dir in dirs:
             exit_code, processed, size_increment = process_dir_recursively(
-                dir, target_dir, conn, processed, size_increment
+                dir,
+                target_dir,
+                conn,
+                processed,
+                size_increment,
+                processed_sources,
+                created_dirs,
             )
             if exit_code != 0:
                 return exit_code, processed, size_increment
 
         if not files:
             return exit_code, processed, size_increment
-        for file_path in tqdm(
-            files,
-            desc=f"syncing : {source_dir.name:<18} |",
-            bar_format="{desc} {bar} [{n_fmt}/{total_fmt}]",
-            ncols=80,
-            miniters=1,
-        ):
-            source = str(Path(*file_path.parts[-2:]))
+        pending = []
+        for entry in files:
+            source = f"{source_dir.name}/{entry.name}"
             if is_unwanted_file(source):
                 continue
-            if is_processed_source(source, conn):
+            if source in processed_sources:
                 continue
-            file_name = file_path.name
-            file_timestamp = get_timestamp(file_path)
-            year_month = file_timestamp.strftime("%Y-%m")
-            target_subdir = target_dir / year_month
-            target_subdir.mkdir(parents=True, exist_ok=True)
-            target_file_path = target_subdir / file_name
-
-            try:
-                with tempfile.NamedTemporaryFile(dir=target_subdir, delete=False) as temp_file:
-                    shutil.copy2(file_path, temp_file.name)
-                    os.replace(temp_file.name, target_file_path)
-            except OSError as e:
-                if e.errno == errno.EACCES:
-                    print("[pyphotobackups] permission denied")
-                    raise Abort
-                if e.errno == errno.ENOSPC:
-                    print("[pyphotobackups] no enough space in destination directory")
-                    raise Abort
-                raise e
-
-            processed += 1
-            size_increment += file_path.stat().st_size
-            cursor = conn.cursor()
-            cursor.execute(
-                "INSERT OR IGNORE INTO sync (source, dest, timestamp, inserted_at) VALUES (?, ?, ?, ?)",
-                (
-                    source,
-                    str(Path(*target_file_path.parts[-2:])),
-                    file_timestamp,
-                    datetime.now(),
-                ),
-            )
-            conn.commit()
-            cursor.close()
+            pending.append((source, entry))
+
+        executor = ThreadPoolExecutor(max_workers=os.cpu_count())
+        futures = {}
+        try:
+            futures = {
+                executor.submit(sync_file, entry, target_dir, created_dirs): source
+                for source, entry in pending
+            }
+            for future in tqdm(
+                as_completed(futures),
+                desc=f"syncing : {source_dir.name:<18} |",
+                bar_format="{desc} {bar} [{n_fmt}/{total_fmt}]",
+                ncols=80,
+                miniters=1,
+                total=len(files),
+                initial=len(files) - len(futures),
+            ):
+                source = futures[future]
+                dest, file_timestamp, file_size = future.result()
+                processed += 1
+                processed_sources.add(source)
+                size_increment += file_size
+                records.append((source, dest, file_timestamp))
+                if len(records) >= SYNC_BATCH_SIZE:
+                    insert_sync_records(records, conn)
+                    records.clear()
+        finally:
+            executor.shutdown(cancel_futures=True)
+            # If the loop was left early, still record the copies that finished successfully
+            for future, source in futures.items():
+                if source in processed_sources or future.cancelled() or future.exception():
+                    continue
+                dest, file_timestamp, file_size = future.result()
+                processed += 1
+                processed_sources.add(source)
+                size_increment += file_size
+                records.append((source, dest, file_timestamp))
     except KeyboardInterrupt:
         print("[pyphotobackups] interrupted!")
         exit_code = 1
@@ -350,4 +712,6 @@ def process_dir_recursively(
             exit_code = 2
         else:
             raise e
+    finally:
+        insert_sync_records(records, conn)
     return exit_code, processed, size_increment
@@ -118,7 +118,7 @@ def cli():
 
 def cleanup():
     cleanup_lock_file(ROOT)
-    if is_iPhone_mounted():
+    if is_iPhone_mounted(MOUNT_POINT):
         unmount_iPhone(MOUNT_POINT)
     if ROOT.exists():
         shutil.rmtree(ROOT)
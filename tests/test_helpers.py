@@ -1,6 +1,13 @@
 import builtins
+import errno
+import io
+import os
 import subprocess
+import threading
+import time
+import zlib
 from datetime import datetime
+from pathlib import Path
 from unittest.mock import Mock, mock_open, patch
 
 import pytest
@@ -9,17 +16,28 @@ from pyphotobackups.helpers import (
     Abort,
     cleanup_lock_file,
     convert_size_to_readable,
+    copy_file,
     create_lock_file,
     get_db_path,
     get_directory_size,
+    get_processed_sources,
     get_serial_number,
+    get_timestamp,
+    get_timestamp_by_heic_metadata,
+    get_timestamp_by_jpeg_metadata,
+    get_timestamp_by_png_metadata,
     init_db,
+    insert_sync_records,
     is_ifuse_installed,
     is_iPhone_mounted,
     is_lock_file_exists,
     is_processed_source,
+    is_unwanted_file,
     mount_iPhone,
+    parse_exif_datetime,
     process_dir_recursively,
+    read_heic_meta_box,
+    sync_file,
     unmount_iPhone,
 )
 
@@ -127,6 +145,53 @@ def test_is_processed_source_false(tmp_path):
     conn.close()
 
 
+def test_get_processed_sources(tmp_path):
+    conn = init_db(tmp_path)
+    assert get_processed_sources(conn) == set()
+
+    cursor = conn.cursor()
+    cursor.execute(
+        "INSERT INTO sync (source, dest, timestamp, inserted_at) VALUES (?, ?, ?, ?)",
+        ("source1", "dest1", datetime.now(), datetime.now()),
+    )
+    conn.commit()
+
+    assert get_processed_sources(conn) == {"source1"}
+
+    conn.close()
+
+
+def test_insert_sync_records(tmp_path):
+    conn = init_db(tmp_path)
+    now = datetime.now()
+    insert_sync_records(
+        [
+            ("100APPLE/a.jpg", "2024-01/a.jpg", now),
+            ("100APPLE/b.jpg", "2024-01/b.jpg", now),
+        ],
+        conn,
+    )
+
+    assert is_processed_source("100APPLE/a.jpg", conn) is True
+    assert is_processed_source("100APPLE/b.jpg", conn) is True
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(DISTINCT inserted_at) FROM sync")
+    assert cursor.fetchone()[0] == 1
+
+    conn.close()
+
+
+def test_is_unwanted_file():
+    assert is_unwanted_file("100APPLE/IMG_0001.AAE") is True
+    assert is_unwanted_file("100APPLE/IMG_0001.aae") is True
+
+
+def test_is_wanted_file():
+    assert is_unwanted_file("100APPLE/IMG_0001.JPG") is False
+    assert is_unwanted_file("100APPLE/IMG.0001.JPG") is False
+    assert is_unwanted_file("100APPLE/IMG_0001") is False
+
+
 # iPhone connection
 @patch("shutil.which", return_value="/usr/bin/ifuse")
 def test_is_ifuse_installed(mock_which):
@@ -141,15 +206,21 @@ def test_is_ifuse_not_installed(mock_which):
 
 
 def test_iPhone_mounted():
-    mock_data = "something /mnt/iphone ifuse rw\n"
+    mock_data = "/dev/sda1 / ext4 rw 0 0\nifuse /mnt/iphone fuse.ifuse rw 0 0\n"
     with patch.object(builtins, "open", mock_open(read_data=mock_data)):
-        assert is_iPhone_mounted() is True
+        assert is_iPhone_mounted(Path("/mnt/iphone")) is True
 
 
 def test_iPhone_not_mounted():
-    mock_data = "something /mnt/usb vfat rw\n"
+    mock_data = "/dev/sdb1 /mnt/usb vfat rw 0 0\n"
     with patch.object(builtins, "open", mock_open(read_data=mock_data)):
-        assert is_iPhone_mounted() is False
+        assert is_iPhone_mounted(Path("/mnt/iphone")) is False
+
+
+def test_iPhone_mounted_elsewhere():
+    mock_data = "ifuse /mnt/other fuse.ifuse rw 0 0\n"
+    with patch.object(builtins, "open", mock_open(read_data=mock_data)):
+        assert is_iPhone_mounted(Path("/mnt/iphone")) is False
 
 
 @patch("pyphotobackups.helpers.subprocess.run")
@@ -211,6 +282,219 @@ def test_get_directory_size(tmp_path):
     assert size == 1024
 
 
+def test_get_directory_size_nested(tmp_path):
+    (tmp_path / "a" / "b").mkdir(parents=True)
+    (tmp_path / "a" / "one.txt").write_text("a" * 100)
+    (tmp_path / "a" / "b" / "two.txt").write_text("a" * 200)
+    (tmp_path / "link.txt").symlink_to(tmp_path / "a" / "one.txt")
+    assert get_directory_size(tmp_path) == 300
+
+
+def test_parse_exif_datetime():
+    assert parse_exif_datetime(b"2024:01:31 12:34:56") == datetime(2024, 1, 31, 12, 34, 56)
+    assert parse_exif_datetime(b"2024:01:31 12:34:56\x00") == datetime(2024, 1, 31, 12, 34, 56)
+
+
+def test_parse_exif_datetime_invalid():
+    with pytest.raises(ValueError):
+        parse_exif_datetime(b"2024-01-31 12:34:56")
+    with pytest.raises(ValueError):
+        parse_exif_datetime(b"0000:00:00 00:00:00")
+
+
+@pytest.mark.parametrize(
+    "value",
+    [b"2024:01:31 12-34-56", b"2024:01:31 12:34:5", b"2024:+1:31 12:34:56", b"2024:01:31  2:34:56"],
+)
+def test_parse_exif_datetime_malformed(value):
+    with pytest.raises(ValueError):
+        parse_exif_datetime(value)
+
+
+def write_png(path, chunks):
+    data = b"\x89PNG\r\n\x1a\n"
+    for chunk_type, chunk_data in chunks:
+        crc = zlib.crc32(chunk_type + chunk_data).to_bytes(4, "big")
+        data += len(chunk_data).to_bytes(4, "big") + chunk_type + chunk_data + crc
+    path.write_bytes(data)
+
+
+def test_get_timestamp_by_png_metadata(tmp_path):
+    path = tmp_path / "image.png"
+    write_png(
+        path,
+        [
+            (b"IHDR", b"\x00" * 13),
+            (b"IDAT", b"\x00" * 4096),
+            (b"eXIf", b"MM\x00*" + b"2024:05:06 07:08:09\x00"),
+            (b"IEND", b""),
+        ],
+    )
+    assert get_timestamp_by_png_metadata(path) == datetime(2024, 5, 6, 7, 8, 9)
+
+
+def test_get_timestamp_by_png_metadata_truncated(tmp_path):
+    path = tmp_path / "image.png"
+    write_png(path, [(b"IHDR", b"\x00" * 13)])
+    # IDAT chunk declaring more data than the file holds
+    path.write_bytes(path.read_bytes() + (4096).to_bytes(4, "big") + b"IDAT" + b"\x00" * 16)
+    assert get_timestamp_by_png_metadata(path) is None
+
+
+def test_get_timestamp_by_png_metadata_without_exif(tmp_path):
+    path = tmp_path / "image.png"
+    write_png(path, [(b"IHDR", b"\x00" * 13), (b"IDAT", b"\x00" * 4096), (b"IEND", b"")])
+    assert get_timestamp_by_png_metadata(path) is None
+
+
+def test_get_timestamp_by_png_metadata_invalid(tmp_path):
+    path = tmp_path / "image.png"
+    path.write_bytes(b"not a png")
+    with pytest.raises(ValueError):
+        get_timestamp_by_png_metadata(path)
+
+
+def build_tiff(ifd0, exif_ifd=None):
+    """
+    Build big-endian TIFF data with ASCII entries in the 0th IFD and, optionally, the Exif IFD.
+    """
+
+    def build_ifd(entries, offset, pointer=None):
+        count = len(entries) + (pointer is not None)
+        data_offset = offset + 2 + count * 12 + 4
+        ifd, data = count.to_bytes(2, "big"), b""
+        for tag, value in sorted(entries.items()):
+            value += b"\x00"
+            ifd += tag.to_bytes(2, "big") + b"\x00\x02" + len(value).to_bytes(4, "big")
+            ifd += (data_offset + len(data)).to_bytes(4, "big")
+            data += value
+        if pointer is not None:
+            ifd += b"\x87\x69\x00\x04\x00\x00\x00\x01" + (data_offset + len(data)).to_bytes(
+                4, "big"
+            )
+        return ifd + b"\x00" * 4 + data
+
+    tiff = b"MM\x00*" + (8).to_bytes(4, "big")
+    if exif_ifd is None:
+        return tiff + build_ifd(ifd0, 8)
+    ifd0_data = build_ifd(ifd0, 8, pointer=True)
+    return tiff + ifd0_data + build_ifd(exif_ifd, 8 + len(ifd0_data))
+
+
+def test_get_timestamp_by_jpeg_metadata(tmp_path):
+    path = tmp_path / "image.jpg"
+    tiff = build_tiff({0x0132: b"2021:02:03 04:05:06"}, {0x9003: b"2020:01:02 03:04:05"})
+    app0 = b"\xff\xe0\x00\x10JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00"
+    app1 = b"\xff\xe1" + (len(tiff) + 8).to_bytes(2, "big") + b"Exif\x00\x00" + tiff
+    path.write_bytes(b"\xff\xd8" + app0 + app1 + b"\xff\xda\x00\x02" + b"\x00" * 64 + b"\xff\xd9")
+    assert get_timestamp_by_jpeg_metadata(path) == datetime(2020, 1, 2, 3, 4, 5)
+
+
+@pytest.mark.parametrize(
+    "tail",
+    [b"\xff\xe2", b"\xff\xe2\x00", b"\xff\xe1\x00\x00", b"\xff\xe2\x00\x01"],
+)
+def test_get_timestamp_by_jpeg_metadata_truncated(tmp_path, tail):
+    path = tmp_path / "image.jpg"
+    app0 = b"\xff\xe0\x00\x10JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00"
+    path.write_bytes(b"\xff\xd8" + app0 + tail)
+    assert get_timestamp_by_jpeg_metadata(path) is None
+
+
+def test_get_timestamp_by_jpeg_metadata_without_exif(tmp_path):
+    path = tmp_path / "image.jpg"
+    path.write_bytes(b"\xff\xd8\xff\xda\x00\x02" + b"\x00" * 64 + b"\xff\xd9")
+    assert get_timestamp_by_jpeg_metadata(path) is None
+
+
+def box(box_type, payload):
+    return (8 + len(payload)).to_bytes(4, "big") + box_type + payload
+
+
+def write_heic(path, exif):
+    ftyp = box(b"ftyp", b"heic" + b"\x00" * 4 + b"mif1heic")
+    infe = box(b"infe", b"\x02\x00\x00\x00" + b"\x00\x01" + b"\x00\x00" + b"hvc1")
+    infe += box(b"infe", b"\x02\x00\x00\x00" + b"\x00\x02" + b"\x00\x00" + b"Exif")
+    iinf = box(b"iinf", b"\x00\x00\x00\x00" + b"\x00\x02" + infe)
+
+    def build_meta(exif_offset):
+        iloc = box(
+            b"iloc",
+            b"\x00\x00\x00\x00"  # version 0
+            + b"\x44\x00"  # offset_size 4, length_size 4, no base offset
+            + b"\x00\x01"  # item_count
+            + b"\x00\x02"  # item_ID
+            + b"\x00\x00"  # data_reference_index
+            + b"\x00\x01"  # extent_count
+            + exif_offset.to_bytes(4, "big")
+            + len(exif).to_bytes(4, "big"),
+        )
+        return box(b"meta", b"\x00\x00\x00\x00" + iinf + iloc)
+
+    exif_offset = len(ftyp) + len(build_meta(0)) + 8
+    path.write_bytes(ftyp + build_meta(exif_offset) + box(b"mdat", exif))
+
+
+def test_get_timestamp_by_heic_metadata(tmp_path):
+    path = tmp_path / "image.heic"
+    tiff = build_tiff({0x0132: b"2024:05:06 07:08:09"})
+    # Exif items start with the offset to the TIFF header, here past "Exif\0\0"
+    write_heic(path, (6).to_bytes(4, "big") + b"Exif\x00\x00" + tiff)
+    assert get_timestamp_by_heic_metadata(path) == datetime(2024, 5, 6, 7, 8, 9)
+
+
+def test_get_timestamp_by_heic_metadata_without_exif(tmp_path):
+    path = tmp_path / "image.heic"
+    path.write_bytes(box(b"ftyp", b"heic" + b"\x00" * 4) + box(b"mdat", b"\x00" * 64))
+    assert get_timestamp_by_heic_metadata(path) is None
+
+
+def test_get_timestamp_by_heic_metadata_truncated(tmp_path):
+    path = tmp_path / "image.heic"
+    # 64-bit box size cut short
+    path.write_bytes(box(b"ftyp", b"heic" + b"\x00" * 4) + b"\x00\x00\x00\x01meta\x00\x00")
+    assert get_timestamp_by_heic_metadata(path) is None
+
+    # iloc box cut short
+    infe = box(b"infe", b"\x02\x00\x00\x00" + b"\x00\x01" + b"\x00\x00" + b"Exif")
+    iinf = box(b"iinf", b"\x00\x00\x00\x00" + b"\x00\x01" + infe)
+    path.write_bytes(box(b"meta", b"\x00\x00\x00\x00" + iinf + box(b"iloc", b"")))
+    assert get_timestamp_by_heic_metadata(path) is None
+
+    # meta box declaring a size smaller than its header is not read into memory
+    path.write_bytes(b"\x00\x00\x00\x04meta" + b"\x00" * 1024)
+    assert get_timestamp_by_heic_metadata(path) is None
+    with open(path, "rb") as f:
+        assert read_heic_meta_box(f) is None
+
+
+def test_read_heic_meta_box_to_end_of_file():
+    f = io.BytesIO(box(b"ftyp", b"heic") + b"\x00\x00\x00\x00meta" + b"payload")
+    assert read_heic_meta_box(f) == b"payload"
+
+
+def test_get_timestamp_uses_png_metadata(tmp_path):
+    path = tmp_path / "IMAGE.PNG"
+    write_png(path, [(b"eXIf", b"MM\x00*" + b"2024:05:06 07:08:09\x00"), (b"IEND", b"")])
+    assert get_timestamp(path) == datetime(2024, 5, 6, 7, 8, 9)
+
+
+def test_get_timestamp_falls_back_to_file_system(tmp_path):
+    path = tmp_path / "video.mov"
+    path.write_bytes(b"\x00" * 16)
+    os.utime(path, (datetime(2023, 1, 2).timestamp(), datetime(2023, 1, 2).timestamp()))
+    assert get_timestamp(path) == datetime(2023, 1, 2)
+
+
+def test_get_timestamp_reuses_stat(tmp_path):
+    path = tmp_path / "video.mov"
+    path.write_bytes(b"\x00" * 16)
+    file_stat = os.stat_result(
+        (0o100644, 0, 0, 1, 0, 0, 16, 0, datetime(2022, 6, 7).timestamp(), 0)
+    )
+    assert get_timestamp(path, file_stat) == datetime(2022, 6, 7)
+
+
 def test_convert_size_to_readable_zero_bytes():
     assert convert_size_to_readable(0) == "0B"
 
@@ -235,6 +519,51 @@ def test_convert_size_to_readable_terabytes():
     assert convert_size_to_readable(1099511627776) == "1.0T"
 
 
+def test_copy_file(tmp_path):
+    source = tmp_path / "source.txt"
+    source.write_bytes(os.urandom(3 * 1024 * 1024 + 7))
+    os.utime(source, (1700000000, 1700000000))
+    source.chmod(0o600)
+    dest = tmp_path / "dest.txt"
+    dest.write_text("old content")
+
+    copy_file(source, dest)
+
+    assert dest.read_bytes() == source.read_bytes()
+    assert dest.stat().st_mtime == 1700000000
+    assert dest.stat().st_mode & 0o777 == 0o600
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["dest.txt", "source.txt"]
+
+
+def test_copy_file_without_sendfile(tmp_path):
+    source = tmp_path / "source.txt"
+    source.write_bytes(os.urandom(1024))
+    dest = tmp_path / "dest.txt"
+
+    with patch("os.sendfile", side_effect=OSError(errno.EINVAL, "Invalid argument")):
+        copy_file(source, dest)
+
+    assert dest.read_bytes() == source.read_bytes()
+
+
+def test_sync_file(tmp_path):
+    file_path = tmp_path / "IMG_0001.txt"
+    file_path.write_text("content1")
+    os.utime(file_path, (datetime(2024, 3, 1).timestamp(), datetime(2024, 3, 1).timestamp()))
+    target_dir = tmp_path / "target"
+    target_dir.mkdir()
+
+    entry = next(entry for entry in os.scandir(tmp_path) if entry.name == "IMG_0001.txt")
+    created_dirs = set()
+    dest, timestamp, size = sync_file(entry, target_dir, created_dirs)
+
+    assert dest == "2024-03/IMG_0001.txt"
+    assert timestamp == datetime(2024, 3, 1)
+    assert size == 8
+    assert (target_dir / "2024-03" / "IMG_0001.txt").read_text() == "content1"
+    assert created_dirs == {"2024-03"}
+
+
 def test_process_dir_recursively(tmp_path):
     source_dir = tmp_path / "source"
     source_sub_dir = source_dir / "sub"
@@ -254,4 +583,76 @@ def test_process_dir_recursively(tmp_path):
     assert exit_code == 0
     assert processed == 2
     assert size_increment == 16
+    assert is_processed_source("source/file1.txt", conn) is True
+    assert is_processed_source("sub/file2.txt", conn) is True
+    conn.close()
+
+
+def test_process_dir_recursively_skips_processed(tmp_path):
+    source_dir = tmp_path / "source"
+    target_dir = tmp_path / "target"
+    source_dir.mkdir()
+    target_dir.mkdir()
+
+    (source_dir / "file1.txt").write_text("content1")
+
+    conn = init_db(tmp_path)
+    process_dir_recursively(source_dir, target_dir, conn, 0, 0)
+    exit_code, processed, size_increment = process_dir_recursively(
+        source_dir, target_dir, conn, 0, 0
+    )
+
+    assert exit_code == 0
+    assert processed == 0
+    assert size_increment == 0
+    conn.close()
+
+
+def test_process_dir_recursively_skips_timestamp_for_processed(tmp_path):
+    source_dir = tmp_path / "source"
+    target_dir = tmp_path / "target"
+    source_dir.mkdir()
+    target_dir.mkdir()
+
+    (source_dir / "file1.txt").write_text("content1")
+    (source_dir / "file1.aae").write_text("sidecar")
+
+    conn = init_db(tmp_path)
+    process_dir_recursively(source_dir, target_dir, conn, 0, 0)
+    with patch("pyphotobackups.helpers.get_timestamp") as mock_get_timestamp:
+        process_dir_recursively(source_dir, target_dir, conn, 0, 0)
+
+    mock_get_timestamp.assert_not_called()
+    conn.close()
+
+
+def test_process_dir_recursively_records_finished_copies_on_error(tmp_path):
+    source_dir = tmp_path / "source"
+    target_dir = tmp_path / "target"
+    source_dir.mkdir()
+    target_dir.mkdir()
+    for name in ("good1.txt", "good2.txt", "bad.txt"):
+        (source_dir / name).write_text("content")
+
+    # all copies are in flight when the bad one fails
+    started = threading.Barrier(3)
+
+    def fake_sync_file(entry, target_dir, created_dirs):
+        started.wait()
+        if entry.name == "bad.txt":
+            raise OSError(errno.EIO, "Input/output error")
+        time.sleep(0.1)
+        return f"2024-01/{entry.name}", datetime(2024, 1, 1), 7
+
+    conn = init_db(tmp_path)
+    with patch("pyphotobackups.helpers.sync_file", side_effect=fake_sync_file):
+        with patch("pyphotobackups.helpers.os.cpu_count", return_value=4):
+            exit_code, processed, size_increment = process_dir_recursively(
+                source_dir, target_dir, conn, 0, 0
+            )
+
+    assert exit_code == 2
+    assert processed == 2
+    assert size_increment == 14
+    assert get_processed_sources(conn) == {"source/good1.txt", "source/good2.txt"}
     conn.close()